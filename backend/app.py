@@ -1,15 +1,37 @@
 # app.py  :
 
 from flask import Flask, request, jsonify, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import mysql.connector
 from mysql.connector import Error
-from datetime import datetime
+from datetime import datetime, date, timedelta, timezone
+from decimal import Decimal
+from concurrent.futures import ProcessPoolExecutor
+import click
+import csv
+import gzip
+import io
+import json
 import os
+import re
 from dotenv import load_dotenv
 import bcrypt
 import logging
 from logging.handlers import RotatingFileHandler
+import threading
+import time
+import urllib.request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -28,8 +50,70 @@ file_handler.setFormatter(logging.Formatter(
 file_handler.setLevel(logging.INFO)
 logger.addHandler(file_handler)
 
+# Sérialisation JSON
+def json_default(obj):
+    """Convertit les types renvoyés par MySQL qui ne sont pas natifs en JSON"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return DefaultJSONProvider.default(obj)
+
+class IsoJSONProvider(DefaultJSONProvider):
+    """Provider json standard, avec les dates au format ISO 8601"""
+    default = staticmethod(json_default)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Provider basé sur orjson : dates et datetimes sérialisés nativement en C"""
+    options = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=json_default, option=self.options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Éviter l'aller-retour bytes -> str -> bytes de l'implémentation par défaut
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=json_default, option=self.options)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+JSON_PROVIDERS = {
+    'standard': IsoJSONProvider,
+    'orjson': OrjsonProvider,
+}
+
+def get_json_provider_class(name=None):
+    """Choisit le provider JSON (variable JSON_PROVIDER), orjson s'il est installé"""
+    name = (name or os.getenv('JSON_PROVIDER') or ('orjson' if orjson else 'standard')).lower()
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f'Provider JSON inconnu: {name}')
+    if name == 'orjson' and orjson is None:
+        logger.warning("orjson n'est pas installé, utilisation du provider JSON standard")
+        name = 'standard'
+    return JSON_PROVIDERS[name]
+
+# Compression des réponses
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+
+def available_encodings():
+    """Encodages supportés, par ordre de préférence du serveur"""
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+def compress_payload(data, encoding):
+    """Compresse un corps de réponse avec l'encodage donné"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    raise ValueError(f'Encodage non supporté: {encoding}')
+
 # Initialisation de l'application Flask
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
+app.json = get_json_provider_class()(app)
 CORS(app, resources={
     r"/api/*": {
         "origins": "*",
@@ -50,12 +134,218 @@ DB_CONFIG = {
 
 }
 
+# Provisionnement en masse : taille des transactions et nombre de processus de hashage
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 500))
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', os.cpu_count() or 1))
+# Au-delà, le hashage bcrypt bloquerait la requête HTTP : utiliser la commande provision-students
+BULK_HTTP_MAX_ROWS = int(os.getenv('BULK_HTTP_MAX_ROWS', 100))
+
+# Synchronisation incrémentale : marge couvrant les transactions validées
+# après la lecture de la version précédente
+SYNC_OVERLAP_SECONDS = float(os.getenv('SYNC_OVERLAP_SECONDS', 5))
+# Durée de conservation des suppressions ; au-delà, le client refait une synchronisation complète
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+# Doit correspondre à innodb_ft_min_token_size côté MySQL
+FULLTEXT_MIN_TOKEN_SIZE = int(os.getenv('FULLTEXT_MIN_TOKEN_SIZE', 3))
+
+# Profilage des requêtes SQL (optionnel)
+QUERY_PROFILING = os.getenv('QUERY_PROFILING', 'False').lower() == 'true'
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+
+def fingerprint_query(sql):
+    """Normalise une requête : littéraux et paramètres remplacés par ?, espaces réduits"""
+    sql = re.sub(r'--[^\n]*|/\*.*?\*/', ' ', sql, flags=re.S)
+    sql = re.sub(r"'(?:[^'\\]|\\.|'')*'", '?', sql)
+    sql = re.sub(r'%s|\b\d+(?:\.\d+)?\b', '?', sql)
+    sql = re.sub(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', 'IN (?+)', sql, flags=re.I)
+    return ' '.join(sql.split())
+
+class QueryProfiler:
+    """Agrège durée et nombre de lignes par empreinte de requête.
+
+    Au premier dépassement de slow_ms pour une empreinte, le plan d'exécution
+    (EXPLAIN) est capturé sur une connexion séparée.
+    """
+    EXPLAINABLE = ('select', 'update', 'delete', 'with')
+
+    def __init__(self, slow_ms):
+        self.slow_ms = slow_ms
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, sql, params, duration_ms, rows):
+        fingerprint = fingerprint_query(sql)
+        slow = duration_ms >= self.slow_ms
+        
+        with self._lock:
+            entry = self._stats.get(fingerprint)
+            if entry is None:
+                entry = self._stats[fingerprint] = {
+                    'fingerprint': fingerprint,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'slow_count': 0,
+                    'explain': None,
+                }
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['rows'] += rows
+            capture = slow and entry['explain'] is None
+            if slow:
+                entry['slow_count'] += 1
+            if capture:
+                entry['explain'] = []
+        
+        if slow:
+            logger.warning(f'Requête lente ({duration_ms:.1f} ms, {rows} lignes): {fingerprint}')
+        if capture:
+            explain = self.explain(sql, params)
+            with self._lock:
+                entry['explain'] = explain
+                entry['sample_duration_ms'] = round(duration_ms, 2)
+
+    def explain(self, sql, params):
+        """Exécute EXPLAIN sur une connexion dédiée pour ne pas perturber la transaction en cours"""
+        if not sql.lstrip().lower().startswith(self.EXPLAINABLE):
+            return []
+        
+        conn = None
+        try:
+            conn = mysql.connector.connect(**DB_CONFIG)
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f'EXPLAIN {sql}', params or ())
+            plan = [
+                {key: value.decode('utf-8') if isinstance(value, bytes) else value
+                 for key, value in row.items()}
+                for row in cursor.fetchall()
+            ]
+            cursor.close()
+            return plan
+        except Error as e:
+            logger.error(f'Erreur lors de la capture du plan EXPLAIN: {e}')
+            return [{'error': str(e)}]
+        finally:
+            if conn:
+                conn.close()
+
+    def top(self, limit=20, sort='total_ms'):
+        """Renvoie les limit empreintes les plus coûteuses selon le critère sort"""
+        with self._lock:
+            entries = [dict(entry) for entry in self._stats.values()]
+        
+        for entry in entries:
+            entry['avg_ms'] = entry['total_ms'] / entry['count']
+            for key in ('total_ms', 'max_ms', 'avg_ms'):
+                entry[key] = round(entry[key], 2)
+        
+        entries.sort(key=lambda entry: entry[sort], reverse=True)
+        return entries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+class ProfilingCursor:
+    """Curseur mesurant chaque requête (exécution et lecture des lignes comprises)"""
+
+    def __init__(self, cursor, profiler):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._pending = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def _run(self, operation, sample_params, call):
+        self._flush()
+        start = time.perf_counter()
+        try:
+            return call()
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            rows = max(self._cursor.rowcount or 0, 0)
+            self._pending = {'sql': operation, 'params': sample_params, 'ms': elapsed_ms,
+                             'rows': rows, 'fetched': 0}
+
+    def execute(self, operation, params=(), *args, **kwargs):
+        return self._run(operation, params,
+                         lambda: self._cursor.execute(operation, params, *args, **kwargs))
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        # Les paramètres de la première ligne suffisent pour un éventuel EXPLAIN
+        seq_params = list(seq_params)
+        return self._run(operation, seq_params[0] if seq_params else (),
+                         lambda: self._cursor.executemany(operation, seq_params, *args, **kwargs))
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        if self._pending:
+            self._pending['ms'] += (time.perf_counter() - start) * 1000
+            if isinstance(result, list):
+                self._pending['fetched'] += len(result)
+            elif result is not None:
+                self._pending['fetched'] += 1
+        return result
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def fetchmany(self, size=1):
+        return self._fetch(self._cursor.fetchmany, size)
+
+    def _flush(self):
+        pending, self._pending = self._pending, None
+        if pending:
+            self._profiler.record(pending['sql'], pending['params'], pending['ms'],
+                                  max(pending['rows'], pending['fetched']))
+
+    def close(self):
+        self._flush()
+        return self._cursor.close()
+
+class ProfilingConnection:
+    """Connexion dont les curseurs sont instrumentés par le QueryProfiler"""
+
+    def __init__(self, conn, profiler):
+        self._conn = conn
+        self._profiler = profiler
+        self._cursors = []
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = ProfilingCursor(self._conn.cursor(*args, **kwargs), self._profiler)
+        self._cursors.append(cursor)
+        return cursor
+
+    def close(self):
+        for cursor in self._cursors:
+            cursor._flush()
+        self._cursors = []
+        return self._conn.close()
+
+query_profiler = QueryProfiler(SLOW_QUERY_MS)
+
 # Helper functions
 def get_db_connection():
     """Établit une connexion à la base de données"""
     try:
         conn = mysql.connector.connect(**DB_CONFIG)
         logger.info("Connexion à la base de données établie")
+        if QUERY_PROFILING:
+            return ProfilingConnection(conn, query_profiler)
         return conn
     except Error as e:
         logger.error(f"Erreur de connexion à la base de données: {e}")
@@ -85,13 +375,20 @@ def validate_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
 
-def format_date_for_json(date_obj):
-    """Formate une date pour la sérialisation JSON"""
-    if isinstance(date_obj, datetime):
-        return date_obj.isoformat()
-    elif isinstance(date_obj, str):
-        return date_obj
-    return None
+def build_fulltext_query(terms):
+    """Construit une requête MATCH ... AGAINST en mode booléen.
+
+    Chaque terme est obligatoire (+) et recherché par préfixe (*), ce qui
+    permet de trouver « Micro » dans « Microsoft ».
+    """
+    return ' '.join(f'+{term}*' for term in terms)
+
+def get_pagination_args(default_per_page=20, max_per_page=100):
+    """Lit les paramètres page / per_page de la requête"""
+    page = max(request.args.get('page', 1, type=int) or 1, 1)
+    per_page = request.args.get('per_page', default_per_page, type=int) or default_per_page
+    per_page = min(max(per_page, 1), max_per_page)
+    return page, per_page
 
 # Routes pour servir les pages HTML
 @app.route('/')
@@ -110,7 +407,13 @@ def log_request_info():
     """Log les informations des requêtes entrantes"""
     logger.info(f'Request: {request.method} {request.path} - IP: {request.remote_addr}')
     if request.method in ['POST', 'PUT']:
-        if request.is_json:
+        if request.endpoint == 'bulk_register_students':
+            # Le roster contient des mots de passe en clair : résumé sans le corps
+            data = request.get_json(silent=True) if request.is_json else None
+            if isinstance(data, list):
+                emails = [entry.get('email') for entry in data if isinstance(entry, dict)]
+                logger.info(f'Request JSON: roster de {len(data)} lignes, emails: {emails}')
+        elif request.is_json:
             logger.info(f'Request JSON: {request.get_json()}')
         else:
             logger.info(f'Request data: {request.data}')
@@ -121,6 +424,29 @@ def log_response_info(response):
     logger.info(f'Response: {response.status_code} - {request.path}')
     return response
 
+@app.after_request
+def compress_response(response):
+    """Compresse (br ou gzip) les réponses JSON de l'API au-delà de COMPRESS_MIN_SIZE"""
+    if (not request.path.startswith('/api/')
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    
+    if response.content_length is not None and response.content_length < COMPRESS_MIN_SIZE:
+        return response
+    
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if not encoding:
+        return response
+    
+    response.set_data(compress_payload(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -413,12 +739,6 @@ def get_all_stages():
         cursor.close()
         conn.close()
         
-        # Formater les dates
-        for stage in stages:
-            stage['date_debut'] = format_date_for_json(stage['date_debut'])
-            stage['date_fin'] = format_date_for_json(stage['date_fin'])
-            stage['date_declaration'] = format_date_for_json(stage['date_declaration'])
-        
         return jsonify(stages), 200
         
     except Error as e:
@@ -446,11 +766,6 @@ def get_stage(stage_id):
         conn.close()
         
         if stage:
-            # Formater les dates
-            stage['date_debut'] = format_date_for_json(stage['date_debut'])
-            stage['date_fin'] = format_date_for_json(stage['date_fin'])
-            stage['date_declaration'] = format_date_for_json(stage['date_declaration'])
-            
             return jsonify(stage), 200
         else:
             return jsonify({'error': 'Stage non trouvé'}), 404
@@ -480,18 +795,138 @@ def get_stages_etudiant(etudiant_id):
         cursor.close()
         conn.close()
         
-        # Formater les dates
-        for stage in stages:
-            stage['date_debut'] = format_date_for_json(stage['date_debut'])
-            stage['date_fin'] = format_date_for_json(stage['date_fin'])
-            stage['date_declaration'] = format_date_for_json(stage['date_declaration'])
-        
         return jsonify(stages), 200
         
     except Error as e:
         logger.error(f'Erreur lors de la récupération des stages étudiant: {e}')
         return jsonify({'error': 'Erreur lors de la récupération des données'}), 500
 
+@app.route('/api/stages/search', methods=['GET'])
+def search_stages():
+    """Recherche plein texte paginée sur l'entreprise, le sujet et le nom de l'étudiant"""
+    q = request.args.get('q', '').strip()
+    statut = request.args.get('statut', '').strip()
+    page, per_page = get_pagination_args()
+    
+    if statut and statut not in ('en_attente', 'valide', 'refuse'):
+        return jsonify({'error': 'Statut invalide'}), 400
+    
+    # Les opérateurs booléens de MySQL sont retirés de la saisie ; les mots plus
+    # courts que innodb_ft_min_token_size (3 par défaut) ne sont pas indexés.
+    # Sans terme indexable, la réponse est vide plutôt qu'une erreur.
+    terms = [t for t in re.findall(r'\w+', q) if len(t) >= FULLTEXT_MIN_TOKEN_SIZE]
+    if not terms:
+        return jsonify({
+            'results': [],
+            'total': 0,
+            'page': page,
+            'per_page': per_page,
+            'pages': 0
+        }), 200
+    
+    against = build_fulltext_query(terms)
+    
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Erreur de connexion à la base de données'}), 500
+        
+        cursor = conn.cursor(dictionary=True)
+        # Chaque branche de l'UNION utilise son propre index FULLTEXT ; un OR entre
+        # les deux MATCH empêcherait MySQL d'utiliser l'un ou l'autre.
+        # Entreprise et sujet partagent un même index et donc le même poids ;
+        # seul le nom de l'étudiant est pondéré double.
+        hits_query = f"""
+        FROM (
+            SELECT stage_id, SUM(score) as score
+            FROM (
+                SELECT id as stage_id,
+                       MATCH(entreprise, sujet) AGAINST (%s IN BOOLEAN MODE) as score
+                FROM stages
+                WHERE MATCH(entreprise, sujet) AGAINST (%s IN BOOLEAN MODE)
+                UNION ALL
+                SELECT st.id, 2 * MATCH(un.nom) AGAINST (%s IN BOOLEAN MODE)
+                FROM users un
+                JOIN stages st ON st.id_etudiant = un.id
+                WHERE MATCH(un.nom) AGAINST (%s IN BOOLEAN MODE)
+            ) matches
+            GROUP BY stage_id
+        ) hits
+        JOIN stages s ON s.id = hits.stage_id
+        JOIN users u ON s.id_etudiant = u.id
+        {'WHERE s.statut = %s' if statut else ''}
+        """
+        params = [against] * 4
+        if statut:
+            params.append(statut)
+        
+        # Le total est compté à part : une page au-delà de la dernière ne renvoie
+        # aucune ligne mais doit indiquer le bon nombre de résultats.
+        cursor.execute(f"SELECT COUNT(*) as total {hits_query}", params)
+        total = cursor.fetchone()['total']
+        
+        cursor.execute(f"""
+        SELECT s.*, u.nom as etudiant_nom, u.email, hits.score
+        {hits_query}
+        ORDER BY hits.score DESC, s.date_declaration DESC
+        LIMIT %s OFFSET %s
+        """, params + [per_page, (page - 1) * per_page])
+        stages = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        
+        for stage in stages:
+            stage['score'] = float(stage['score'])
+        
+        return jsonify({
+            'results': stages,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': (total + per_page - 1) // per_page
+        }), 200
+        
+    except Error as e:
+        logger.error(f'Erreur lors de la recherche des stages: {e}')
+        return jsonify({'error': 'Erreur lors de la recherche'}), 500
+
+@app.route('/api/entreprises/autocomplete', methods=['GET'])
+def autocomplete_entreprises():
+    """Suggère des noms d'entreprise commençant par le préfixe saisi"""
+    prefix = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 10, type=int) or 10, 1), 50)
+    
+    if not prefix:
+        return jsonify([]), 200
+    
+    # Échapper les jokers de LIKE pour que le préfixe reste littéral et que
+    # MySQL puisse parcourir idx_stages_entreprise par plage.
+    escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Erreur de connexion à la base de données'}), 500
+        
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+        SELECT entreprise, COUNT(*) as nb_stages
+        FROM stages
+        WHERE entreprise LIKE %s
+        GROUP BY entreprise
+        ORDER BY nb_stages DESC, entreprise
+        LIMIT %s
+        """, (escaped + '%', limit))
+        suggestions = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        
+        return jsonify(suggestions), 200
+        
+    except Error as e:
+        logger.error(f'Erreur lors de l\'autocomplétion des entreprises: {e}')
+        return jsonify({'error': 'Erreur lors de la récupération des données'}), 500
+
 @app.route('/api/stages', methods=['POST'])
 def create_stage():
     """Crée un nouveau stage"""
@@ -667,12 +1102,6 @@ def get_stats():
         cursor.close()
         conn.close()
         
-        # Formater les dates
-        for stage in derniers_stages:
-            stage['date_debut'] = format_date_for_json(stage['date_debut'])
-            stage['date_fin'] = format_date_for_json(stage['date_fin'])
-            stage['date_declaration'] = format_date_for_json(stage['date_declaration'])
-        
         return jsonify({
             'stats': stats,
             'derniers_stages': derniers_stages
@@ -708,6 +1137,391 @@ def get_etudiants():
         logger.error(f'Erreur lors de la récupération des étudiants: {e}')
         return jsonify({'error': 'Erreur lors de la récupération des données'}), 500
 
+# Routes de profilage
+QUERY_SORT_KEYS = ('total_ms', 'max_ms', 'avg_ms', 'count', 'rows', 'slow_count')
+
+@app.route('/api/admin/queries', methods=['GET'])
+def get_query_profile():
+    """Renvoie les requêtes SQL les plus coûteuses avec leur plan EXPLAIN"""
+    limit = min(max(request.args.get('limit', 20, type=int) or 20, 1), 200)
+    sort = request.args.get('sort', 'total_ms')
+    if sort not in QUERY_SORT_KEYS:
+        return jsonify({'error': f'Tri invalide, valeurs possibles: {", ".join(QUERY_SORT_KEYS)}'}), 400
+    
+    return jsonify({
+        'enabled': QUERY_PROFILING,
+        'slow_query_ms': query_profiler.slow_ms,
+        'queries': query_profiler.top(limit, sort)
+    }), 200
+
+@app.route('/api/admin/queries', methods=['DELETE'])
+def reset_query_profile():
+    """Remet à zéro les statistiques du profileur de requêtes"""
+    query_profiler.reset()
+    logger.info('Statistiques du profileur de requêtes réinitialisées')
+    return jsonify({'success': True, 'message': 'Statistiques réinitialisées'}), 200
+
+@app.cli.command('slow-queries')
+@click.option('--url', default=lambda: f"http://localhost:{os.getenv('PORT', 5000)}",
+              help="URL du serveur en cours d'exécution")
+@click.option('--limit', default=10, show_default=True, help='Nombre de requêtes affichées')
+@click.option('--sort', type=click.Choice(QUERY_SORT_KEYS), default='total_ms', show_default=True)
+@click.option('--explain/--no-explain', default=True, help='Afficher les plans EXPLAIN capturés')
+def slow_queries_command(url, limit, sort, explain):
+    """Affiche le top des requêtes SQL mesurées par un serveur lancé avec QUERY_PROFILING=true."""
+    endpoint = f"{url.rstrip('/')}/api/admin/queries?limit={limit}&sort={sort}"
+    try:
+        with urllib.request.urlopen(endpoint) as response:
+            data = json.loads(response.read())
+    except OSError as e:
+        raise click.ClickException(f'Impossible de joindre {endpoint}: {e}')
+    
+    if not data['enabled']:
+        click.echo('Profilage désactivé sur le serveur (QUERY_PROFILING=true pour l\'activer)')
+    
+    click.echo(f"{'total ms':>10} {'moy ms':>8} {'max ms':>8} {'appels':>7} {'lignes':>8}  requête")
+    for query in data['queries']:
+        click.echo(f"{query['total_ms']:>10.1f} {query['avg_ms']:>8.1f} {query['max_ms']:>8.1f} "
+                   f"{query['count']:>7} {query['rows']:>8}  {query['fingerprint']}")
+        if explain and query['explain']:
+            for row in query['explain']:
+                click.echo(f"{'':>45}EXPLAIN table={row.get('table')} type={row.get('type')} "
+                           f"key={row.get('key')} rows={row.get('rows')} extra={row.get('Extra')}")
+
+# Route de synchronisation incrémentale
+@app.route('/api/sync', methods=['GET'])
+def sync_data():
+    """Renvoie les stages et étudiants modifiés ou supprimés depuis une version donnée.
+
+    Sans paramètre since, ou si since est plus ancien que la durée de conservation
+    des suppressions, l'ensemble des données est renvoyé (full = true).
+    Avec etudiant_id, seuls les stages de cet étudiant sont synchronisés.
+    """
+    since_param = request.args.get('since', '').strip()
+    etudiant_id = request.args.get('etudiant_id', type=int)
+    
+    since = None
+    if since_param:
+        try:
+            since = datetime.fromisoformat(since_param) - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        except ValueError:
+            return jsonify({'error': 'Paramètre since invalide (format ISO 8601 attendu)'}), 400
+    
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Erreur de connexion à la base de données'}), 500
+        
+        cursor = conn.cursor(dictionary=True)
+        
+        # La version est lue avant les données : une modification concurrente
+        # sera renvoyée à la prochaine synchronisation.
+        cursor.execute("SELECT NOW(6) as version, UTC_TIMESTAMP(6) as utc_now")
+        row = cursor.fetchone()
+        version = row['version']
+        
+        # NOW(6) est naïf, dans le fuseau de la session MySQL : un since avec
+        # décalage (…Z, …+02:00) y est ramené avant toute comparaison.
+        if since is not None and since.tzinfo is not None:
+            session_offset = version - row['utc_now']
+            since = since.astimezone(timezone.utc).replace(tzinfo=None) + session_offset
+        
+        # Les suppressions plus anciennes ont pu être purgées
+        if since is not None and since < version - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS):
+            since = None
+        
+        stage_query = """
+        SELECT s.*, u.nom as etudiant_nom, u.email
+        FROM stages s
+        JOIN users u ON s.id_etudiant = u.id
+        """
+        student_filter = ' AND s.id_etudiant = %s' if etudiant_id else ''
+        student_params = (etudiant_id,) if etudiant_id else ()
+        
+        deleted = {'stages': [], 'users': []}
+        if since is None:
+            cursor.execute(stage_query + ' WHERE 1 = 1' + student_filter, student_params)
+            stages = cursor.fetchall()
+        else:
+            # Deux requêtes plutôt qu'un OR pour que chacune utilise son index updated_at ;
+            # un étudiant renommé modifie etudiant_nom dans tous ses stages.
+            cursor.execute(stage_query + ' WHERE s.updated_at > %s' + student_filter,
+                           (since,) + student_params)
+            stages = {stage['id']: stage for stage in cursor.fetchall()}
+            cursor.execute(stage_query + ' WHERE u.updated_at > %s' + student_filter,
+                           (since,) + student_params)
+            stages.update((stage['id'], stage) for stage in cursor.fetchall())
+            stages = list(stages.values())
+            
+            if etudiant_id:
+                cursor.execute("""
+                SELECT entity, entity_id
+                FROM deletions
+                WHERE id_etudiant = %s AND entity = 'stage' AND deleted_at > %s
+                """, (etudiant_id, since))
+            else:
+                cursor.execute("""
+                SELECT entity, entity_id
+                FROM deletions
+                WHERE deleted_at > %s
+                """, (since,))
+            for row in cursor.fetchall():
+                deleted['stages' if row['entity'] == 'stage' else 'users'].append(row['entity_id'])
+        
+        users = []
+        if not etudiant_id:
+            cursor.execute("""
+                SELECT id, nom, email, role, updated_at
+                FROM users
+                WHERE role = 'etudiant'
+            """ + ('AND updated_at > %s' if since else ''), (since,) if since else ())
+            users = cursor.fetchall()
+        
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            'version': version,
+            'full': since is None,
+            'stages': stages,
+            'users': users,
+            'deleted': deleted
+        }), 200
+        
+    except Error as e:
+        logger.error(f'Erreur lors de la synchronisation: {e}')
+        return jsonify({'error': 'Erreur lors de la synchronisation des données'}), 500
+
+@app.cli.command('prune-sync-tombstones')
+def prune_sync_tombstones_command():
+    """Supprime les suppressions plus anciennes que SYNC_TOMBSTONE_RETENTION_DAYS.
+
+    La même durée sert à /api/sync pour imposer une synchronisation complète,
+    ce qui garantit qu'aucun client ne manque une suppression purgée.
+    """
+    days = SYNC_TOMBSTONE_RETENTION_DAYS
+    conn = get_db_connection()
+    if not conn:
+        raise click.ClickException('Erreur de connexion à la base de données')
+    
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "DELETE FROM deletions WHERE deleted_at < NOW(6) - INTERVAL %s DAY",
+            (days,)
+        )
+        conn.commit()
+        click.echo(f'{cursor.rowcount} suppressions de plus de {days} jours purgées')
+    except Error as e:
+        conn.rollback()
+        raise click.ClickException(f'Erreur lors de la purge: {e}')
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/api/etudiants/bulk', methods=['POST'])
+def bulk_register_students():
+    """Crée en masse des comptes étudiants à partir d'une liste (fichier CSV ou JSON)"""
+    try:
+        if 'roster' in request.files:
+            content = request.files['roster'].read().decode('utf-8-sig')
+            rows = parse_roster_csv(content)
+        else:
+            data = request.get_json(silent=True)
+            if not isinstance(data, list):
+                return jsonify({'error': 'Fichier roster ou liste JSON d\'étudiants requis'}), 400
+            rows = [(index, entry) for index, entry in enumerate(data, start=1)]
+        
+        if len(rows) > BULK_HTTP_MAX_ROWS:
+            return jsonify({
+                'error': f'Roster limité à {BULK_HTTP_MAX_ROWS} lignes par requête. Pour un roster '
+                         'plus grand, utiliser : flask --app app provision-students roster.csv'
+            }), 413
+        
+        # Pas de pool de processus dans le serveur web : hashage séquentiel, taille bornée
+        report = provision_students(rows, parallel=False)
+        return jsonify(report), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Error as e:
+        logger.error(f'Erreur lors du provisionnement des étudiants: {e}')
+        return jsonify({'error': 'Erreur lors de la création des comptes'}), 500
+    except Exception as e:
+        logger.error(f'Erreur inattendue lors du provisionnement des étudiants: {e}')
+        return jsonify({'error': 'Une erreur inattendue est survenue'}), 500
+
+# Provisionnement en masse des étudiants
+def parse_roster_csv(content):
+    """Lit un roster CSV (colonnes nom, email, password ; séparateur , ou ;)"""
+    if not content.strip():
+        raise ValueError('Le fichier roster est vide')
+    
+    try:
+        dialect = csv.Sniffer().sniff(content.splitlines()[0], delimiters=',;')
+    except csv.Error:
+        dialect = csv.excel
+    
+    reader = csv.DictReader(io.StringIO(content), dialect=dialect)
+    fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    missing = {'nom', 'email', 'password'} - set(fieldnames)
+    if missing:
+        raise ValueError(f'Colonnes manquantes dans le roster: {", ".join(sorted(missing))}')
+    reader.fieldnames = fieldnames
+    
+    return [(reader.line_num, row) for row in reader]
+
+def provision_students(rows, parallel=True):
+    """Crée les comptes étudiants d'un roster et renvoie le résultat ligne par ligne.
+
+    rows est une liste de couples (numéro de ligne, dict nom/email/password).
+    Les emails existants sont recherchés par lots, les mots de passe hashés
+    (en parallèle si parallel), puis users et student_auth sont insérés avec
+    executemany dans une transaction par lot de BULK_CHUNK_SIZE comptes.
+    """
+    results = []
+    candidates = []
+    seen = set()
+    
+    for line, row in rows:
+        row = row if isinstance(row, dict) else {}
+        nom = str(row.get('nom') or '').strip()
+        email = str(row.get('email') or '').strip().lower()
+        password = str(row.get('password') or '')
+        result = {'line': line, 'email': email}
+        results.append(result)
+        
+        if not all([nom, email, password]):
+            result.update(status='invalid', error='Tous les champs sont requis')
+        elif not validate_email(email):
+            result.update(status='invalid', error='Format d\'email invalide')
+        elif len(password) < 6:
+            result.update(status='invalid', error='Le mot de passe doit contenir au moins 6 caractères')
+        elif email in seen:
+            result.update(status='duplicate', error='Email présent plusieurs fois dans le roster')
+        else:
+            seen.add(email)
+            candidates.append((result, nom, email, password))
+    
+    if candidates:
+        conn = get_db_connection()
+        if not conn:
+            raise Error('Erreur de connexion à la base de données')
+        
+        cursor = conn.cursor()
+        try:
+            existing = set()
+            emails = [email for _, _, email, _ in candidates]
+            for start in range(0, len(emails), BULK_CHUNK_SIZE):
+                chunk = emails[start:start + BULK_CHUNK_SIZE]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f"SELECT email FROM users WHERE email IN ({placeholders})", chunk)
+                # IN compare sans tenir compte de la casse et renvoie l'email tel que stocké
+                existing.update(email.lower() for (email,) in cursor.fetchall())
+            
+            to_create = []
+            for candidate in candidates:
+                result, _, email, _ = candidate
+                if email in existing:
+                    result.update(status='exists', error='Cet email est déjà utilisé')
+                else:
+                    to_create.append(candidate)
+            
+            password_hashes = hash_passwords([password for _, _, _, password in to_create],
+                                             parallel=parallel)
+            
+            for start in range(0, len(to_create), BULK_CHUNK_SIZE):
+                chunk = to_create[start:start + BULK_CHUNK_SIZE]
+                hashes = password_hashes[start:start + BULK_CHUNK_SIZE]
+                insert_student_chunk(conn, cursor, chunk, hashes)
+        finally:
+            cursor.close()
+            conn.close()
+    
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    
+    logger.info(f'Provisionnement des étudiants terminé: {summary}')
+    return {'summary': summary, 'total': len(results), 'results': results}
+
+def hash_passwords(passwords, parallel=True):
+    """Hash une liste de mots de passe, en parallèle au-delà de quelques comptes"""
+    if not parallel or HASH_WORKERS <= 1 or len(passwords) < 2 * HASH_WORKERS:
+        return [hash_password(password) for password in passwords]
+    
+    chunksize = max(1, len(passwords) // (HASH_WORKERS * 4))
+    with ProcessPoolExecutor(max_workers=HASH_WORKERS) as executor:
+        return list(executor.map(hash_password, passwords, chunksize=chunksize))
+
+def insert_student_chunk(conn, cursor, chunk, password_hashes):
+    """Insère un lot d'étudiants dans users et student_auth en une transaction"""
+    emails = [email for _, _, email, _ in chunk]
+    try:
+        cursor.executemany(
+            "INSERT INTO users (nom, email, role) VALUES (%s, %s, 'etudiant')",
+            [(nom, email) for _, nom, email, _ in chunk]
+        )
+        
+        # Les ids d'un INSERT multi-lignes ne sont pas garantis consécutifs
+        # (innodb_autoinc_lock_mode = 2) : on les relit par email.
+        placeholders = ', '.join(['%s'] * len(emails))
+        cursor.execute(f"SELECT id, email FROM users WHERE email IN ({placeholders})", emails)
+        user_ids = {email.lower(): user_id for user_id, email in cursor.fetchall()}
+        
+        cursor.executemany(
+            "INSERT INTO student_auth (user_id, email, password_hash) VALUES (%s, %s, %s)",
+            [(user_ids[email], email, password_hash)
+             for email, password_hash in zip(emails, password_hashes)]
+        )
+        
+        conn.commit()
+        
+        for result, _, email, _ in chunk:
+            result.update(status='created', user_id=user_ids[email])
+            
+    except Error as e:
+        conn.rollback()
+        
+        # Rejouer le lot ligne par ligne pour que seule la ligne fautive soit en erreur
+        if len(chunk) > 1:
+            logger.warning(f'Lot de {len(chunk)} étudiants annulé, nouvel essai ligne par ligne: {e}')
+            for candidate, password_hash in zip(chunk, password_hashes):
+                insert_student_chunk(conn, cursor, [candidate], [password_hash])
+            return
+        
+        result, _, email, _ = chunk[0]
+        logger.error(f'Erreur lors de l\'insertion de l\'étudiant {email}: {e}')
+        
+        error_msg = str(e).lower()
+        if 'duplicate' in error_msg or '1062' in str(e):
+            result.update(status='exists', error='Cet email est déjà utilisé')
+        else:
+            result.update(status='error', error=str(e))
+
+@app.cli.command('provision-students')
+@click.argument('roster', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--report', type=click.File('w', encoding='utf-8'),
+              help='Fichier CSV où écrire le résultat ligne par ligne')
+def provision_students_command(roster, report):
+    """Crée les comptes étudiants listés dans un fichier CSV (nom,email,password)."""
+    try:
+        result = provision_students(parse_roster_csv(roster.read()))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    
+    if report:
+        writer = csv.DictWriter(report, fieldnames=['line', 'email', 'status', 'user_id', 'error'])
+        writer.writeheader()
+        writer.writerows(result['results'])
+    else:
+        for row in result['results']:
+            if row['status'] != 'created':
+                click.echo(f"ligne {row['line']}: {row['email']} -> {row['status']} ({row['error']})")
+    
+    summary = ', '.join(f'{status}: {count}' for status, count in sorted(result['summary'].items()))
+    click.echo(f"{result['total']} lignes traitées - {summary}")
+
 if __name__ == '__main__':
     # Configuration du serveur
     port = int(os.getenv('PORT', 5000))
@@ -0,0 +1,97 @@
+# bench_json.py :
+#
+# Micro-benchmark de la sérialisation de /api/stages : temps d'encodage et
+# octets transmis selon le provider JSON et l'encodage de compression.
+#
+#   python bench_json.py            (10 000 et 100 000 lignes)
+#   python bench_json.py 5000 50000
+
+import random
+import sys
+import timeit
+from datetime import datetime, date, timedelta
+
+from flask.json.provider import DefaultJSONProvider
+
+from app import (app, IsoJSONProvider, OrjsonProvider, orjson, json_default,
+                 available_encodings, compress_payload)
+
+ENTREPRISES = ['Google', 'Microsoft', 'Amazon', 'Capgemini', 'Sopra Steria',
+               'Thales', 'Orange', 'Atos', 'Dassault Systèmes', 'OCP']
+SUJETS = ['Développement web React', 'Cloud Computing', 'Machine Learning',
+          'Migration de données vers un entrepôt', 'Sécurité des applications',
+          'Automatisation des tests et intégration continue']
+STATUTS = ['en_attente', 'valide', 'refuse']
+
+
+def generate_stages(n):
+    """Génère n lignes ayant la forme renvoyée par le curseur dictionnaire de /api/stages"""
+    rnd = random.Random(42)
+    origin = datetime(2024, 1, 1, 9, 0, 0)
+    stages = []
+    for i in range(1, n + 1):
+        debut = date(2024, 1, 1) + timedelta(days=rnd.randint(0, 365))
+        stages.append({
+            'id': i,
+            'id_etudiant': rnd.randint(1, n // 3 + 1),
+            'entreprise': rnd.choice(ENTREPRISES),
+            'sujet': rnd.choice(SUJETS),
+            'date_debut': debut,
+            'date_fin': debut + timedelta(days=rnd.randint(60, 180)),
+            'statut': rnd.choice(STATUTS),
+            'date_declaration': origin + timedelta(minutes=rnd.randint(0, 500000)),
+            'etudiant_nom': f'Etudiant {i}',
+            'email': f'etudiant{i}@ecole.fr',
+        })
+    return stages
+
+
+def legacy_encode(stages):
+    """Ancien chemin : copie des dates champ par champ puis json standard de Flask"""
+    provider = DefaultJSONProvider(app)
+    rows = []
+    for stage in stages:
+        row = dict(stage)
+        for field in ('date_debut', 'date_fin', 'date_declaration'):
+            value = row[field]
+            row[field] = value.isoformat() if isinstance(value, datetime) else None
+        rows.append(row)
+    return provider.dumps(rows).encode('utf-8')
+
+
+def main(sizes):
+    encoders = {
+        'legacy (format_date + json)': legacy_encode,
+        'standard (IsoJSONProvider)': lambda rows: IsoJSONProvider(app).dumps(rows).encode('utf-8'),
+    }
+    if orjson:
+        encoders['orjson (OrjsonProvider)'] = (
+            lambda rows: orjson.dumps(rows, option=OrjsonProvider.options,
+                                      default=json_default))
+    else:
+        print('orjson non installé : provider orjson ignoré\n')
+
+    for n in sizes:
+        stages = generate_stages(n)
+        print(f'=== /api/stages, {n} lignes ===')
+
+        print(f'{"encodeur":<30} {"temps (ms)":>12} {"octets":>12}')
+        body = None
+        for name, encode in encoders.items():
+            runs = 5
+            elapsed = min(timeit.repeat(lambda: encode(stages), number=1, repeat=runs))
+            body = encode(stages)
+            print(f'{name:<30} {elapsed * 1000:>12.1f} {len(body):>12}')
+
+        print(f'\n{"compression":<30} {"temps (ms)":>12} {"octets":>12} {"ratio":>8}')
+        print(f'{"identity":<30} {0.0:>12.1f} {len(body):>12} {1.0:>8.2f}')
+        for encoding in available_encodings():
+            elapsed = min(timeit.repeat(lambda: compress_payload(body, encoding), number=1, repeat=3))
+            compressed = compress_payload(body, encoding)
+            ratio = len(body) / len(compressed)
+            print(f'{encoding:<30} {elapsed * 1000:>12.1f} {len(compressed):>12} {ratio:>8.2f}')
+        print()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
@@ -26,6 +26,17 @@ let filteredStages = [];
 let currentPage = 1;
 const itemsPerPage = 10;
 
+// Recherche serveur (plein texte, paginée)
+// Doit correspondre à FULLTEXT_MIN_TOKEN_SIZE côté serveur
+const FULLTEXT_MIN_TOKEN_SIZE = 3;
+const SUGGESTION_MIN_LENGTH = 2;
+const SEARCH_DEBOUNCE_MS = 250;
+let searchMode = false;
+let searchTotalPages = 1;
+let searchTimer = null;
+let searchRequestId = 0;
+let suggestionRequestId = 0;
+
 // Initialize admin page
 const initAdminPage = withAuth('admin')(async function() {
     try {
@@ -75,22 +86,23 @@ async function loadDashboardData() {
     
     try {
         // Load data in parallel
-        const [statsData, stagesData, studentsData] = await Promise.all([
+        // Stages et étudiants viennent du cache local, complété par les modifications récentes
+        const [statsData, dataset] = await Promise.all([
             apiService.getStats(),
-            apiService.getStages(),
-            apiService.getStudents()
+            apiService.syncDataset()
         ]);
         
         // Update stats
         updateStats(statsData.stats);
         
         // Update stages
-        allStages = stagesData;
+        allStages = dataset.stages;
         filteredStages = [...allStages];
+        searchMode = false;
         renderStagesTable();
         
         // Update students
-        allStudents = studentsData;
+        allStudents = dataset.users;
         renderStudentsTable();
         
         // Update recent stages
@@ -132,7 +144,29 @@ function showLoading(show) {
 // Global filter function
 window.filterStages = function() {
     const statusFilter = document.getElementById('filterStatus').value;
-    const searchFilter = document.getElementById('filterSearch').value.toLowerCase();
+    const searchFilter = document.getElementById('filterSearch').value.trim();
+    
+    clearTimeout(searchTimer);
+    
+    // Même découpage que le serveur : seuls les mots assez longs sont indexés.
+    // Sans mot indexable (« IT x », « C++ », « R&D »), le filtrage reste local.
+    const indexable = hasIndexableTerm(searchFilter);
+    
+    searchTimer = setTimeout(() => {
+        updateEntrepriseSuggestions(searchFilter);
+        if (indexable) {
+            searchStagesOnServer(1);
+        }
+    }, SEARCH_DEBOUNCE_MS);
+    
+    if (indexable) {
+        return;
+    }
+    
+    // Invalider une recherche serveur encore en cours
+    searchRequestId++;
+    searchMode = false;
+    const searchLower = searchFilter.toLowerCase();
     
     filteredStages = allStages.filter(stage => {
         // Filter by status
@@ -141,14 +175,14 @@ window.filterStages = function() {
         }
         
         // Filter by search term
-        if (searchFilter) {
+        if (searchLower) {
             const searchIn = `
                 ${stage.entreprise || ''} 
                 ${stage.sujet || ''} 
                 ${stage.etudiant_nom || ''}
             `.toLowerCase();
             
-            if (!searchIn.includes(searchFilter)) {
+            if (!searchIn.includes(searchLower)) {
                 return false;
             }
         }
@@ -160,6 +194,62 @@ window.filterStages = function() {
     renderStagesTable();
 };
 
+async function searchStagesOnServer(page) {
+    const requestId = ++searchRequestId;
+    
+    try {
+        const data = await apiService.searchStages({
+            q: document.getElementById('filterSearch').value.trim(),
+            statut: document.getElementById('filterStatus').value,
+            page,
+            perPage: itemsPerPage
+        });
+        
+        // Ignorer les réponses arrivées après une saisie plus récente
+        if (requestId !== searchRequestId) return;
+        
+        searchMode = true;
+        filteredStages = data.results;
+        searchTotalPages = data.pages;
+        currentPage = data.page;
+        renderStagesTable();
+    } catch (error) {
+        console.error('Error searching stages:', error);
+        const errorInfo = handleApiError(error);
+        showAlert(pageAlert, errorInfo.message, 'error');
+    }
+}
+
+function hasIndexableTerm(text) {
+    const terms = text.match(/[\p{L}\p{N}_]+/gu) || [];
+    return terms.some(term => term.length >= FULLTEXT_MIN_TOKEN_SIZE);
+}
+
+async function updateEntrepriseSuggestions(prefix) {
+    const datalist = document.getElementById('entrepriseSuggestions');
+    if (!datalist) return;
+    
+    const requestId = ++suggestionRequestId;
+    
+    if (prefix.length < SUGGESTION_MIN_LENGTH) {
+        datalist.innerHTML = '';
+        return;
+    }
+    
+    try {
+        const suggestions = await apiService.autocompleteEntreprises(prefix);
+        
+        // Ignorer les suggestions arrivées après une saisie plus récente
+        if (requestId !== suggestionRequestId) return;
+        
+        datalist.innerHTML = suggestions
+            .map(s => `<option value="${escapeHtml(s.entreprise)}"></option>`)
+            .join('');
+    } catch (error) {
+        console.error('Error loading suggestions:', error);
+    }
+}
+
 function renderStagesTable() {
     if (!stagesTableBody || filteredStages.length === 0) {
         showNoDataMessage();
@@ -173,11 +263,11 @@ function renderStagesTable() {
     // Clear existing rows
     stagesTableBody.innerHTML = '';
     
-    // Calculate pagination
-    const totalPages = Math.ceil(filteredStages.length / itemsPerPage);
+    // Calculate pagination (en mode recherche, le serveur renvoie déjà la page)
+    const totalPages = searchMode ? searchTotalPages : Math.ceil(filteredStages.length / itemsPerPage);
     const startIndex = (currentPage - 1) * itemsPerPage;
     const endIndex = startIndex + itemsPerPage;
-    const pageStages = filteredStages.slice(startIndex, endIndex);
+    const pageStages = searchMode ? filteredStages : filteredStages.slice(startIndex, endIndex);
     
     // Render stages
     pageStages.forEach(stage => {
@@ -259,19 +349,26 @@ function updatePagination(totalPages) {
     // Set up event listeners
     prevBtn.onclick = () => {
         if (currentPage > 1) {
-            currentPage--;
-            renderStagesTable();
+            goToPage(currentPage - 1);
         }
     };
     
     nextBtn.onclick = () => {
         if (currentPage < totalPages) {
-            currentPage++;
-            renderStagesTable();
+            goToPage(currentPage + 1);
         }
     };
 }
 
+function goToPage(page) {
+    if (searchMode) {
+        searchStagesOnServer(page);
+    } else {
+        currentPage = page;
+        renderStagesTable();
+    }
+}
+
 function renderStudentsTable() {
     if (!studentsTableBody || allStudents.length === 0) {
         document.getElementById('noStudents').style.display = 'block';
@@ -553,9 +650,10 @@ function escapeHtml(text) {
 document.addEventListener('DOMContentLoaded', initAdminPage);
 
 // Global logout function
-window.logout = function() {
+window.logout = async function() {
     if (confirm('Êtes-vous sûr de vouloir vous déconnecter ?')) {
-        authService.clearSession();
+        // Attendre la suppression du cache IndexedDB avant de quitter la page
+        await authService.clearSession();
         window.location.href = '/';
     }
 };
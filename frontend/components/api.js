@@ -18,9 +18,125 @@ class APIError extends Error {
     }
 }
 
+// Bases IndexedDB créées par SyncCache, pour pouvoir les supprimer à la déconnexion
+const SYNC_DATABASES_KEY = 'sync_databases';
+
+function getSyncDatabases() {
+    try {
+        return JSON.parse(localStorage.getItem(SYNC_DATABASES_KEY)) || [];
+    } catch {
+        return [];
+    }
+}
+
+function deleteDatabase(name) {
+    return new Promise(resolve => {
+        const request = indexedDB.deleteDatabase(name);
+        request.onsuccess = () => resolve();
+        request.onerror = () => resolve();
+        request.onblocked = () => resolve();
+    });
+}
+
+/**
+ * Cache IndexedDB des données synchronisées (une base par utilisateur et périmètre)
+ */
+class SyncCache {
+    constructor(scope, userId) {
+        this.dbName = `gestion_stages_sync_${scope}_user_${userId}`;
+        this.userId = String(userId);
+        this.db = null;
+    }
+
+    static isSupported() {
+        return typeof indexedDB !== 'undefined';
+    }
+
+    register() {
+        const databases = getSyncDatabases();
+        if (!databases.some(entry => entry.name === this.dbName)) {
+            databases.push({ name: this.dbName, userId: this.userId });
+            localStorage.setItem(SYNC_DATABASES_KEY, JSON.stringify(databases));
+        }
+    }
+
+    open() {
+        if (this.db) return Promise.resolve(this.db);
+
+        this.register();
+
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.open(this.dbName, 1);
+            request.onupgradeneeded = () => {
+                const db = request.result;
+                db.createObjectStore('stages', { keyPath: 'id' });
+                db.createObjectStore('users', { keyPath: 'id' });
+                db.createObjectStore('meta');
+            };
+            request.onsuccess = () => {
+                this.db = request.result;
+                // Libérer la base si un autre onglet demande sa suppression
+                this.db.onversionchange = () => this.close();
+                resolve(this.db);
+            };
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    close() {
+        if (this.db) {
+            this.db.close();
+            this.db = null;
+        }
+    }
+
+    async getVersion() {
+        const db = await this.open();
+        return new Promise((resolve, reject) => {
+            const request = db.transaction('meta').objectStore('meta').get('version');
+            request.onsuccess = () => resolve(request.result || null);
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    async applyDelta(delta) {
+        const db = await this.open();
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(['stages', 'users', 'meta'], 'readwrite');
+            const stages = tx.objectStore('stages');
+            const users = tx.objectStore('users');
+
+            if (delta.full) {
+                stages.clear();
+                users.clear();
+            }
+
+            delta.stages.forEach(stage => stages.put(stage));
+            delta.users.forEach(user => users.put(user));
+            delta.deleted.stages.forEach(id => stages.delete(id));
+            delta.deleted.users.forEach(id => users.delete(id));
+            tx.objectStore('meta').put(delta.version, 'version');
+
+            tx.oncomplete = () => resolve();
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        });
+    }
+
+    async getAll(storeName) {
+        const db = await this.open();
+        return new Promise((resolve, reject) => {
+            const request = db.transaction(storeName).objectStore(storeName).getAll();
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+}
+
 class APIService {
     constructor() {
         this.token = localStorage.getItem('token');
+        this.syncCaches = {};
     }
 
     setToken(token) {
@@ -142,6 +258,14 @@ class APIService {
         return this.request(`/stages/${id}`);
     }
 
+    async searchStages({ q, statut, page = 1, perPage = 20 } = {}) {
+        return this.request(`/stages/search${buildQueryString({ q, statut, page, per_page: perPage })}`);
+    }
+
+    async autocompleteEntreprises(prefix, limit = 10) {
+        return this.request(`/entreprises/autocomplete${buildQueryString({ q: prefix, limit })}`);
+    }
+
     async getStudentStages(studentId) {
         return this.request(`/stages/etudiant/${studentId}`);
     }
@@ -175,6 +299,59 @@ class APIService {
         });
     }
 
+    // ============ SYNC ============
+    /**
+     * Synchronise les stages (et les étudiants pour l'admin) avec le cache IndexedDB :
+     * seules les modifications depuis la dernière visite sont téléchargées.
+     */
+    async syncDataset({ etudiantId } = {}) {
+        const userId = localStorage.getItem('user_id');
+        const scope = etudiantId ? `etudiant_${etudiantId}` : 'admin';
+
+        if (!SyncCache.isSupported() || !userId) {
+            const delta = await this.request(`/sync${buildQueryString({ etudiant_id: etudiantId })}`);
+            return { stages: sortStages(delta.stages), users: sortUsers(delta.users) };
+        }
+
+        const key = `${scope}_${userId}`;
+        const cache = this.syncCaches[key] || (this.syncCaches[key] = new SyncCache(scope, userId));
+
+        let since = null;
+        try {
+            since = await cache.getVersion();
+        } catch (error) {
+            console.warn('Cache IndexedDB illisible, synchronisation complète:', error);
+        }
+
+        const delta = await this.request(`/sync${buildQueryString({ since, etudiant_id: etudiantId })}`);
+        await cache.applyDelta(delta);
+
+        const [stages, users] = await Promise.all([cache.getAll('stages'), cache.getAll('users')]);
+        return { stages: sortStages(stages), users: sortUsers(users) };
+    }
+
+    /**
+     * Supprime les bases IndexedDB de synchronisation, sauf celles de keepUserId
+     */
+    async clearSyncCaches({ keepUserId = null } = {}) {
+        if (!SyncCache.isSupported()) return;
+
+        const keep = keepUserId === null ? null : String(keepUserId);
+        const databases = getSyncDatabases();
+        const kept = databases.filter(entry => entry.userId === keep);
+        const removed = databases.filter(entry => entry.userId !== keep);
+
+        Object.entries(this.syncCaches).forEach(([key, cache]) => {
+            if (cache.userId !== keep) {
+                cache.close();
+                delete this.syncCaches[key];
+            }
+        });
+
+        localStorage.setItem(SYNC_DATABASES_KEY, JSON.stringify(kept));
+        await Promise.all(removed.map(entry => deleteDatabase(entry.name)));
+    }
+
     // ============ STATISTICS ============
     async getStats() {
         return this.request('/stats');
@@ -243,6 +420,15 @@ class APIService {
     }
 }
 
+// Même ordre que les listes renvoyées par l'API
+function sortStages(stages) {
+    return stages.sort((a, b) => (b.date_declaration || '').localeCompare(a.date_declaration || ''));
+}
+
+function sortUsers(users) {
+    return users.sort((a, b) => a.nom.localeCompare(b.nom));
+}
+
 // Export singleton instance
 export const apiService = new APIService();
 
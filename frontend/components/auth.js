@@ -87,11 +87,14 @@ class AuthService {
         localStorage.setItem('user', JSON.stringify(user));
         localStorage.setItem('user_id', user.id);
         
+        // Ne pas laisser au nouvel utilisateur les données d'une session précédente
+        apiService.clearSyncCaches({ keepUserId: user.id });
+        
         // Dispatch login event
         window.dispatchEvent(new CustomEvent('auth:login', { detail: { user } }));
     }
 
-    clearSession() {
+    async clearSession() {
         this.currentUser = null;
         localStorage.removeItem('token');
         localStorage.removeItem('user');
@@ -100,6 +103,9 @@ class AuthService {
         
         // Dispatch logout event
         window.dispatchEvent(new CustomEvent('auth:logout'));
+        
+        // Supprimer les données synchronisées (IndexedDB) de l'appareil
+        await apiService.clearSyncCaches();
     }
 
     isAuthenticated() {
@@ -259,9 +259,10 @@ function clearFormErrors() {
 window.showRegister = showRegister;
 window.showLogin = showLogin;
 
-window.logout = function() {
+window.logout = async function() {
     if (confirm('Êtes-vous sûr de vouloir vous déconnecter ?')) {
-        authService.clearSession();
+        // Attendre la suppression du cache IndexedDB avant de quitter la page
+        await authService.clearSession();
         window.location.href = '/';
     }
 };
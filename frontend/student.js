@@ -205,7 +205,7 @@ async function loadStages() {
     showLoading(true);
     
     try {
-        const stages = await apiService.getStudentStages(currentStudentId);
+        const { stages } = await apiService.syncDataset({ etudiantId: currentStudentId });
         currentStages = stages;
         
         if (stages.length === 0) {
@@ -455,9 +455,10 @@ function escapeHtml(text) {
 document.addEventListener('DOMContentLoaded', initStudentPage);
 
 // Global logout function
-window.logout = function() {
+window.logout = async function() {
     if (confirm('Êtes-vous sûr de vouloir vous déconnecter ?')) {
-        authService.clearSession();
+        // Attendre la suppression du cache IndexedDB avant de quitter la page
+        await authService.clearSession();
         window.location.href = '/';
     }
 };
\ No newline at end of file
@@ -5,7 +5,11 @@ CREATE TABLE IF NOT EXISTS users (
     id INT AUTO_INCREMENT PRIMARY KEY,
     nom VARCHAR(100) NOT NULL,
     email VARCHAR(100) NOT NULL UNIQUE,
-    role ENUM('etudiant', 'admin') NOT NULL DEFAULT 'etudiant'
+    role ENUM('etudiant', 'admin') NOT NULL DEFAULT 'etudiant',
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    FULLTEXT INDEX ft_users_nom (nom),
+    -- Synchronisation incrémentale (/api/sync)
+    INDEX idx_users_updated_at (updated_at)
 );
 
 CREATE TABLE IF NOT EXISTS student_auth (
@@ -35,9 +39,54 @@ CREATE TABLE IF NOT EXISTS stages (
     date_fin DATE NOT NULL,
     statut ENUM('en_attente', 'valide', 'refuse') DEFAULT 'en_attente',
     date_declaration TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (id_etudiant) REFERENCES users(id) ON DELETE CASCADE
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    FOREIGN KEY (id_etudiant) REFERENCES users(id) ON DELETE CASCADE,
+    -- Synchronisation incrémentale (/api/sync)
+    INDEX idx_stages_updated_at (updated_at),
+    -- Autocomplétion par préfixe (LIKE 'abc%') sur le nom d'entreprise
+    INDEX idx_stages_entreprise (entreprise),
+    -- Recherche plein texte pondérée (/api/stages/search)
+    FULLTEXT INDEX ft_stages_entreprise_sujet (entreprise, sujet)
 );
 
+-- Pour une base existante, créer les index de recherche :
+-- ALTER TABLE users ADD FULLTEXT INDEX ft_users_nom (nom);
+-- ALTER TABLE stages ADD INDEX idx_stages_entreprise (entreprise);
+-- ALTER TABLE stages ADD FULLTEXT INDEX ft_stages_entreprise_sujet (entreprise, sujet);
+
+-- Pierres tombales des suppressions, lues par la synchronisation incrémentale.
+-- id_etudiant limite les suppressions renvoyées à un étudiant à ses propres stages.
+-- Les lignes plus anciennes que SYNC_TOMBSTONE_RETENTION_DAYS (30 jours par défaut)
+-- sont purgées par `flask --app app prune-sync-tombstones` (à planifier, ex. cron) ;
+-- un client dont la version est plus ancienne reçoit une synchronisation complète.
+CREATE TABLE IF NOT EXISTS deletions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    entity ENUM('stage', 'user') NOT NULL,
+    entity_id INT NOT NULL,
+    id_etudiant INT NOT NULL,
+    deleted_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    INDEX idx_deletions_deleted_at (deleted_at),
+    INDEX idx_deletions_etudiant (id_etudiant, deleted_at)
+);
+
+DROP TRIGGER IF EXISTS stages_after_delete;
+CREATE TRIGGER stages_after_delete AFTER DELETE ON stages FOR EACH ROW
+    INSERT INTO deletions (entity, entity_id, id_etudiant) VALUES ('stage', OLD.id, OLD.id_etudiant);
+
+-- Les suppressions en cascade ne déclenchent pas les triggers de stages
+DROP TRIGGER IF EXISTS users_before_delete;
+CREATE TRIGGER users_before_delete BEFORE DELETE ON users FOR EACH ROW
+    INSERT INTO deletions (entity, entity_id, id_etudiant)
+    SELECT 'stage', id, id_etudiant FROM stages WHERE id_etudiant = OLD.id;
+
+DROP TRIGGER IF EXISTS users_after_delete;
+CREATE TRIGGER users_after_delete AFTER DELETE ON users FOR EACH ROW
+    INSERT INTO deletions (entity, entity_id, id_etudiant) VALUES ('user', OLD.id, OLD.id);
+
+-- Pour une base existante, ajouter les colonnes de version :
+-- ALTER TABLE users ADD updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6), ADD INDEX idx_users_updated_at (updated_at);
+-- ALTER TABLE stages ADD updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6), ADD INDEX idx_stages_updated_at (updated_at);
+
 INSERT INTO users (nom, email, role) VALUES 
 ('Jean Dupont', 'jean.dupont@email.com', 'etudiant'),
 ('Marie Martin', 'marie.martin@email.com', 'etudiant'),